@@ -1,15 +1,35 @@
 # Backend modules
-from .pdf_processor import PDFProcessor
-from .embedding_generator import EmbeddingGenerator
-from .pinecone_manager import PineconeManager
-from .assistant import ConversationalAssistant
-from .config import Config
+# Os submódulos são importados sob demanda para não carregar pypdf, openai e
+# pinecone quando apenas parte do backend é usada.
+import importlib
+
+_LAZY_IMPORTS = {
+    'PDFProcessor': '.pdf_processor',
+    'EmbeddingGenerator': '.embedding_generator',
+    'PineconeManager': '.pinecone_manager',
+    'ConversationalAssistant': '.assistant',
+    'SemanticCache': '.semantic_cache',
+    'LocalVectorIndex': '.local_index',
+    'Config': '.config',
+    'load_config': '.config'
+}
 
 __all__ = [
     'PDFProcessor',
-    'EmbeddingGenerator', 
+    'EmbeddingGenerator',
     'PineconeManager',
     'ConversationalAssistant',
-    'Config'
+    'SemanticCache',
+    'LocalVectorIndex',
+    'Config',
+    'load_config'
 ]
 
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        module = importlib.import_module(_LAZY_IMPORTS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
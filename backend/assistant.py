@@ -3,33 +3,66 @@ Módulo principal do assistente conversacional.
 Integra todos os componentes: processamento de PDF, geração de embeddings,
 indexação no Pinecone e geração de respostas.
 """
-from typing import List, Dict, Any
+import time
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+import numpy as np
+import tiktoken
 from openai import OpenAI
 from .pdf_processor import PDFProcessor
 from .embedding_generator import EmbeddingGenerator
 from .pinecone_manager import PineconeManager
-from .config import Config
+from .local_index import LocalVectorIndex
+from .config import load_config
 
 
 class ConversationalAssistant:
     """Classe principal do assistente conversacional."""
     
+    # Tempo de vida (segundos) das respostas em cache
+    ANSWER_CACHE_TTL = 600
+    
+    # Número máximo de respostas em cache (o assistente é compartilhado entre sessões)
+    ANSWER_CACHE_MAX_ENTRIES = 256
+    
+    # Resposta exibida quando a geração pelo GPT falha; nunca vai para o cache
+    ANSWER_ERROR_MESSAGE = "Desculpe, ocorreu um erro ao gerar a resposta. Tente novamente."
+    
     def __init__(self):
         """Inicializa o assistente conversacional."""
         # Valida configurações
-        Config.validate_config()
+        self.config = load_config()
+        self.config.validate_config()
         
         # Inicializa componentes
-        self.pdf_processor = PDFProcessor(Config.PDF_DIRECTORY)
-        self.embedding_generator = EmbeddingGenerator(Config.OPENAI_API_KEY)
+        self.pdf_processor = PDFProcessor(self.config.pdf_directory, self.config.pdf_cache_directory)
+        self.embedding_generator = EmbeddingGenerator(
+            self.config.openai_api_key,
+            cache_path=self.config.embedding_cache_path
+        )
         self.pinecone_manager = PineconeManager(
-            Config.PINECONE_API_KEY,
-            Config.PINECONE_ENVIRONMENT,
-            Config.PINECONE_INDEX_NAME
+            self.config.pinecone_api_key,
+            self.config.pinecone_environment,
+            self.config.pinecone_index_name,
+            self.embedding_generator.get_embedding_dimension()
         )
         
+        # Cópia local dos vetores indexados, usada em corpora pequenos
+        self.local_index = LocalVectorIndex()
+        
         # Cliente OpenAI para geração de respostas
-        self.openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
+        self.openai_client = OpenAI(api_key=self.config.openai_api_key)
+        
+        # Tokenizador do modelo de chat, usado para limitar o contexto
+        self._chat_encoding = tiktoken.encoding_for_model(self.config.openai_chat_model)
+        
+        # Caches de perguntas repetidas (chave: pergunta normalizada)
+        self._embed_cached = lru_cache(maxsize=1024)(self.embedding_generator.generate_embedding)
+        # Ordenado por momento de gravação: as entradas mais antigas ficam no início
+        self._answer_cache: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._answer_cache_lock = threading.Lock()
     
     def index_pdfs(self) -> Dict[str, Any]:
         """
@@ -55,10 +88,10 @@ class ConversationalAssistant:
         chunk_metadata = []
         
         for doc in documents:
-            chunks = self.pdf_processor.chunk_text(
-                doc['text'],
-                Config.CHUNK_SIZE,
-                Config.CHUNK_OVERLAP
+            chunks = self.pdf_processor.chunk_document(
+                doc,
+                self.config.chunk_size,
+                self.config.chunk_overlap
             )
             
             for i, chunk in enumerate(chunks):
@@ -80,6 +113,18 @@ class ConversationalAssistant:
         # Indexa no Pinecone
         print("Indexando no Pinecone...")
         self.pinecone_manager.upsert_documents(chunk_metadata, embeddings)
+        vector_ids = [PineconeManager.vector_id(doc, i) for i, doc in enumerate(chunk_metadata)]
+        
+        # Remove vetores de PDFs que saíram do diretório, para que o índice tenha
+        # exatamente os mesmos vetores que a cópia local
+        self.pinecone_manager.delete_stale_vectors(
+            {vector_id for vector_id, embedding in zip(vector_ids, embeddings) if embedding}
+        )
+        self.local_index.build(chunk_metadata, embeddings, vector_ids)
+        
+        # Respostas em cache podem estar desatualizadas após nova indexação
+        with self._answer_cache_lock:
+            self._answer_cache.clear()
         
         return {
             'success': True,
@@ -89,6 +134,18 @@ class ConversationalAssistant:
             'embeddings_generated': len([e for e in embeddings if e])
         }
     
+    def embed_question(self, question: str) -> List[float]:
+        """
+        Gera (ou obtém do cache) o embedding de uma pergunta.
+        
+        Args:
+            question (str): Pergunta do usuário.
+            
+        Returns:
+            List[float]: Embedding da pergunta normalizada.
+        """
+        return self._embed_cached(question.strip().lower())
+    
     def ask_question(self, question: str, top_k: int = None) -> Dict[str, Any]:
         """
         Responde uma pergunta baseada nos documentos indexados.
@@ -108,105 +165,273 @@ class ConversationalAssistant:
                 'sources': []
             }
         
-        top_k = top_k or Config.DEFAULT_TOP_K
+        top_k = top_k or self.config.default_top_k
+        cache_key = self._answer_cache_key(question, top_k)
+        
+        # Verifica se a resposta já está em cache
+        cached = self._get_cached_answer(cache_key)
+        if cached:
+            return self._copy_answer(cached)
         
         try:
-            # Gera embedding da pergunta
-            print("Gerando embedding da pergunta...")
-            question_embedding = self.embedding_generator.generate_embedding(question)
-            
-            # Busca documentos similares
-            print("Buscando documentos similares...")
-            similar_docs = self.pinecone_manager.query_similar_documents(
-                question_embedding,
-                top_k
-            )
-            
-            if not similar_docs:
-                return {
-                    'success': True,
-                    'message': 'Nenhum documento relevante encontrado.',
-                    'answer': 'Desculpe, não encontrei informações relevantes para responder sua pergunta.',
-                    'sources': []
-                }
-            
-            # Filtra documentos por threshold de similaridade
-            relevant_docs = [
-                doc for doc in similar_docs 
-                if doc['score'] >= Config.SIMILARITY_THRESHOLD
-            ]
+            result = self._retrieve(question, top_k)
             
-            if not relevant_docs:
-                return {
-                    'success': True,
-                    'message': 'Documentos encontrados não são suficientemente relevantes.',
-                    'answer': 'Encontrei alguns documentos, mas eles não parecem ser muito relevantes para sua pergunta. Pode reformular a pergunta?',
-                    'sources': []
-                }
-            
-            # Prepara contexto para o GPT
-            context = self._prepare_context(relevant_docs)
+            if 'context' not in result:
+                return result
             
             # Gera resposta usando GPT
             print("Gerando resposta...")
+            context = result.pop('context')
             answer = self._generate_answer(question, context)
             
-            # Prepara informações das fontes
-            sources = [
-                {
-                    'filename': doc['filename'],
-                    'score': round(doc['score'], 3),
-                    'chunk_index': doc['chunk_index']
-                }
-                for doc in relevant_docs
-            ]
+            if answer is None:
+                result['answer'] = self.ANSWER_ERROR_MESSAGE
+                result['error'] = True
+                return result
             
+            result['answer'] = answer
+            self._store_answer(cache_key, result)
+            
+            return result
+        
+        except Exception as e:
             return {
-                'success': True,
-                'message': 'Resposta gerada com sucesso.',
-                'answer': answer,
-                'sources': sources,
-                'documents_found': len(similar_docs),
-                'relevant_documents': len(relevant_docs)
+                'success': False,
+                'message': f'Erro ao processar pergunta: {str(e)}',
+                'answer': '',
+                'sources': []
             }
+    
+    def ask_question_stream(self, question: str, top_k: int = None) -> Dict[str, Any]:
+        """
+        Responde uma pergunta com a resposta do GPT entregue em partes (streaming).
+        
+        O resultado tem os mesmos campos de ask_question, mais 'answer_stream',
+        um iterador com os trechos da resposta. O campo 'answer' só fica completo
+        depois que o iterador for consumido.
+        
+        Args:
+            question (str): Pergunta do usuário.
+            top_k (int): Número de documentos similares a buscar.
+            
+        Returns:
+            Dict[str, Any]: Resposta (em streaming) e metadados.
+        """
+        if not question.strip():
+            result = {
+                'success': False,
+                'message': 'Pergunta não pode estar vazia.',
+                'answer': '',
+                'sources': []
+            }
+            result['answer_stream'] = iter([result['answer']])
+            return result
+        
+        top_k = top_k or self.config.default_top_k
+        cache_key = self._answer_cache_key(question, top_k)
+        
+        # Verifica se a resposta já está em cache
+        cached = self._get_cached_answer(cache_key)
+        if cached:
+            return dict(self._copy_answer(cached), answer_stream=iter([cached['answer']]))
+        
+        try:
+            result = self._retrieve(question, top_k)
         
         except Exception as e:
-            return {
+            result = {
                 'success': False,
                 'message': f'Erro ao processar pergunta: {str(e)}',
                 'answer': '',
                 'sources': []
             }
+        
+        if 'context' not in result:
+            result['answer_stream'] = iter([result['answer']])
+            return result
+        
+        context = result.pop('context')
+        result['answer'] = ''
+        result['answer_stream'] = self._stream_answer(question, context, cache_key, result)
+        
+        return result
+    
+    def _answer_cache_key(self, question: str, top_k: int) -> str:
+        """Chave do cache de respostas (pergunta normalizada e top_k)."""
+        return f"{top_k}:{question.strip().lower()}"
+    
+    def _get_cached_answer(self, cache_key: str):
+        """Retorna a resposta em cache se ainda estiver dentro do TTL."""
+        with self._answer_cache_lock:
+            cached = self._answer_cache.get(cache_key)
+            if cached is None:
+                return None
+            
+            if time.monotonic() - cached[0] >= self.ANSWER_CACHE_TTL:
+                del self._answer_cache[cache_key]
+                return None
+        
+        print("Resposta obtida do cache.")
+        return cached[1]
+    
+    @staticmethod
+    def _copy_answer(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Copia uma resposta e suas fontes; o cache é compartilhado entre sessões."""
+        return dict(result, sources=[dict(source) for source in result['sources']])
+    
+    def _store_answer(self, cache_key: str, result: Dict[str, Any]):
+        """
+        Grava uma resposta no cache.
+        
+        Remove antes as entradas expiradas e, se o limite for atingido, as
+        gravadas há mais tempo.
+        """
+        now = time.monotonic()
+        
+        with self._answer_cache_lock:
+            self._answer_cache.pop(cache_key, None)
+            
+            while self._answer_cache:
+                oldest_key, (cached_at, _) = next(iter(self._answer_cache.items()))
+                if now - cached_at < self.ANSWER_CACHE_TTL and len(self._answer_cache) < self.ANSWER_CACHE_MAX_ENTRIES:
+                    break
+                del self._answer_cache[oldest_key]
+            
+            self._answer_cache[cache_key] = (now, self._copy_answer(result))
+    
+    def _retrieve(self, question: str, top_k: int) -> Dict[str, Any]:
+        """
+        Busca os documentos relevantes para a pergunta.
+        
+        Args:
+            question (str): Pergunta do usuário.
+            top_k (int): Número de documentos similares a buscar.
+            
+        Returns:
+            Dict[str, Any]: Resultado parcial. Quando há documentos relevantes,
+                inclui 'context' para a geração da resposta; caso contrário já
+                contém a resposta final.
+        """
+        # Gera embedding da pergunta
+        print("Gerando embedding da pergunta...")
+        question_embedding = self.embed_question(question)
+        
+        # Busca documentos similares
+        print("Buscando documentos similares...")
+        similar_docs = self._query_documents(question_embedding, top_k)
+        
+        if not similar_docs:
+            return {
+                'success': True,
+                'message': 'Nenhum documento relevante encontrado.',
+                'answer': 'Desculpe, não encontrei informações relevantes para responder sua pergunta.',
+                'sources': []
+            }
+        
+        # Filtra documentos por threshold de similaridade
+        scores = np.array([doc['score'] for doc in similar_docs], dtype=np.float64)
+        mask = scores >= self.config.similarity_threshold
+        relevant_docs = [doc for doc, keep in zip(similar_docs, mask) if keep]
+        relevant_scores = np.round(scores[mask], 3).tolist()
+        
+        if not relevant_docs:
+            return {
+                'success': True,
+                'message': 'Documentos encontrados não são suficientemente relevantes.',
+                'answer': 'Encontrei alguns documentos, mas eles não parecem ser muito relevantes para sua pergunta. Pode reformular a pergunta?',
+                'sources': []
+            }
+        
+        # Prepara informações das fontes
+        sources = [
+            {
+                'filename': doc['filename'],
+                'score': score,
+                'chunk_index': doc['chunk_index']
+            }
+            for doc, score in zip(relevant_docs, relevant_scores)
+        ]
+        
+        return {
+            'success': True,
+            'message': 'Resposta gerada com sucesso.',
+            'context': self._prepare_context(relevant_docs),
+            'sources': sources,
+            'documents_found': len(similar_docs),
+            'relevant_documents': len(relevant_docs)
+        }
+    
+    def _query_documents(self, question_embedding: List[float], top_k: int) -> List[Dict[str, Any]]:
+        """
+        Busca os documentos mais similares, localmente ou no Pinecone.
+        
+        A busca local só é usada quando a cópia em memória tem exatamente os
+        mesmos vetores que o índice; caso contrário (índice populado por outro
+        processo ou grande demais) a consulta vai ao Pinecone.
+        
+        Args:
+            question_embedding (List[float]): Embedding da pergunta.
+            top_k (int): Número de documentos a retornar.
+            
+        Returns:
+            List[Dict[str, Any]]: Documentos similares com scores.
+        """
+        local_size = len(self.local_index)
+        if local_size and local_size == self.pinecone_manager.get_index_stats().get('total_vectors'):
+            return self.local_index.query(question_embedding, top_k)
+        
+        return self.pinecone_manager.query_similar_documents(question_embedding, top_k)
     
-    def _prepare_context(self, documents: List[Dict[str, Any]]) -> str:
+    def _prepare_context(self, documents: List[Dict[str, Any]], max_context_tokens: int = None) -> str:
         """
         Prepara o contexto a partir dos documentos relevantes.
         
+        Os documentos são adicionados em ordem de score até esgotar o orçamento
+        de tokens; o último documento que não couber inteiro é truncado.
+        
         Args:
             documents (List[Dict[str, Any]]): Documentos relevantes.
+            max_context_tokens (int): Número máximo de tokens do contexto.
             
         Returns:
             str: Contexto formatado.
         """
+        max_context_tokens = max_context_tokens or self.config.max_context_tokens
+        remaining = max_context_tokens
         context_parts = []
         
-        for i, doc in enumerate(documents, 1):
-            context_parts.append(f"Documento {i} ({doc['filename']}):")
-            context_parts.append(doc['text'])
+        ranked = sorted(documents, key=lambda doc: doc['score'], reverse=True)
+        
+        for i, doc in enumerate(ranked, 1):
+            header = f"Documento {i} ({doc['filename']}):"
+            remaining -= len(self._chat_encoding.encode(header))
+            
+            if remaining <= 0:
+                break
+            
+            tokens = self._chat_encoding.encode(doc['text'])
+            text = doc['text'] if len(tokens) <= remaining else self._chat_encoding.decode(tokens[:remaining])
+            remaining -= len(tokens)
+            
+            context_parts.append(header)
+            context_parts.append(text)
             context_parts.append("")  # Linha em branco
+            
+            if remaining <= 0:
+                break
         
         return "\n".join(context_parts)
     
-    def _generate_answer(self, question: str, context: str) -> str:
+    def _build_messages(self, question: str, context: str) -> List[Dict[str, str]]:
         """
-        Gera resposta usando GPT baseada na pergunta e contexto.
+        Monta as mensagens enviadas ao GPT.
         
         Args:
             question (str): Pergunta do usuário.
             context (str): Contexto dos documentos relevantes.
             
         Returns:
-            str: Resposta gerada.
+            List[Dict[str, str]]: Mensagens do chat.
         """
         prompt = f"""Você é um assistente especializado em responder perguntas baseado em documentos fornecidos.
 
@@ -223,13 +448,26 @@ Instruções:
 
 Resposta:"""
         
+        return [
+            {"role": "system", "content": "Você é um assistente especializado em responder perguntas baseado em documentos."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _generate_answer(self, question: str, context: str) -> Optional[str]:
+        """
+        Gera resposta usando GPT baseada na pergunta e contexto.
+        
+        Args:
+            question (str): Pergunta do usuário.
+            context (str): Contexto dos documentos relevantes.
+            
+        Returns:
+            Optional[str]: Resposta gerada, ou None se a chamada ao GPT falhar.
+        """
         try:
             response = self.openai_client.chat.completions.create(
-                model=Config.OPENAI_CHAT_MODEL,
-                messages=[
-                    {"role": "system", "content": "Você é um assistente especializado em responder perguntas baseado em documentos."},
-                    {"role": "user", "content": prompt}
-                ],
+                model=self.config.openai_chat_model,
+                messages=self._build_messages(question, context),
                 max_tokens=1000,
                 temperature=0.3
             )
@@ -238,34 +476,83 @@ Resposta:"""
         
         except Exception as e:
             print(f"Erro ao gerar resposta: {str(e)}")
-            return "Desculpe, ocorreu um erro ao gerar a resposta. Tente novamente."
+            return None
     
-    def get_system_status(self) -> Dict[str, Any]:
+    def _stream_answer(self, question: str, context: str, cache_key: str, result: Dict[str, Any]) -> Iterator[str]:
+        """
+        Gera a resposta do GPT em partes, à medida que os tokens chegam.
+        
+        Ao final, grava a resposta completa em result['answer'] e no cache.
+        Se a chamada ao GPT falhar, marca result['error'] e não grava no cache.
+        
+        Args:
+            question (str): Pergunta do usuário.
+            context (str): Contexto dos documentos relevantes.
+            cache_key (str): Chave do cache de respostas.
+            result (Dict[str, Any]): Resultado a ser completado.
+            
+        Yields:
+            str: Trechos da resposta.
+        """
+        print("Gerando resposta...")
+        parts = []
+        
+        try:
+            stream = self.openai_client.chat.completions.create(
+                model=self.config.openai_chat_model,
+                messages=self._build_messages(question, context),
+                max_tokens=1000,
+                temperature=0.3,
+                stream=True
+            )
+            
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        
+        except Exception as e:
+            print(f"Erro ao gerar resposta: {str(e)}")
+            result['answer'] = self.ANSWER_ERROR_MESSAGE
+            result['error'] = True
+            yield self.ANSWER_ERROR_MESSAGE
+            return
+        
+        result['answer'] = "".join(parts).strip()
+        self._store_answer(cache_key, {
+            key: value for key, value in result.items() if key != 'answer_stream'
+        })
+    
+    def get_system_status(self, force_refresh: bool = False) -> Dict[str, Any]:
         """
         Retorna o status do sistema.
         
+        Args:
+            force_refresh (bool): Consulta o Pinecone em vez de usar as
+                estatísticas em cache.
+        
         Returns:
             Dict[str, Any]: Status dos componentes.
         """
         try:
-            pinecone_stats = self.pinecone_manager.get_index_stats()
+            pinecone_stats = self.pinecone_manager.get_index_stats(force_refresh=force_refresh)
             
             return {
                 'pinecone_connected': True,
                 'total_vectors': pinecone_stats.get('total_vectors', 0),
                 'index_dimension': pinecone_stats.get('dimension', 0),
                 'index_fullness': pinecone_stats.get('index_fullness', 0),
-                'pdf_directory': Config.PDF_DIRECTORY,
-                'embedding_model': Config.OPENAI_EMBEDDING_MODEL,
-                'chat_model': Config.OPENAI_CHAT_MODEL
+                'pdf_directory': self.config.pdf_directory,
+                'embedding_model': self.config.openai_embedding_model,
+                'chat_model': self.config.openai_chat_model
             }
         
         except Exception as e:
             return {
                 'pinecone_connected': False,
                 'error': str(e),
-                'pdf_directory': Config.PDF_DIRECTORY,
-                'embedding_model': Config.OPENAI_EMBEDDING_MODEL,
-                'chat_model': Config.OPENAI_CHAT_MODEL
+                'pdf_directory': self.config.pdf_directory,
+                'embedding_model': self.config.openai_embedding_model,
+                'chat_model': self.config.openai_chat_model
             }
 
@@ -2,41 +2,55 @@
 Arquivo de configuração centralizada para o assistente conversacional.
 """
 import os
-from dotenv import load_dotenv
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
 
 if os.getenv("STREAMLIT_CLOUD") != "1":
     from dotenv import load_dotenv
     load_dotenv()
 
 
+@dataclass(frozen=True)
 class Config:
-    """Classe de configuração centralizada."""
+    """
+    Configuração centralizada, imutável.
+    
+    Use load_config() para obter a instância lida das variáveis de ambiente.
+    """
     
     # OpenAI Configuration
-    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-    OPENAI_EMBEDDING_MODEL = "text-embedding-3-large"
-    OPENAI_CHAT_MODEL = "gpt-4o"
+    openai_api_key: Optional[str] = None
+    openai_embedding_model: str = "text-embedding-3-small"
+    embedding_dimensions: int = 768
+    embedding_cache_path: str = 'embeddings_cache.db'
+    embedding_batch_size: int = 100
+    embedding_max_concurrency: int = 5
+    openai_chat_model: str = "gpt-4o"
     
     # Pinecone Configuration
-    PINECONE_API_KEY = os.getenv('PINE_CONE_API_KEY')
-    PINECONE_ENVIRONMENT = os.getenv('PINE_CONE_ENVIRONMENT', 'us-east-1-aws')
-    PINECONE_INDEX_NAME = os.getenv('PINE_CONE_INDEX_NAME', 'pdf-assistant')
+    pinecone_api_key: Optional[str] = None
+    pinecone_environment: str = 'us-east-1-aws'
+    pinecone_index_name: str = 'pdf-assistant'
     
     # Application Configuration
-    PDF_DIRECTORY = os.getenv('PDF_DIRECTORY', 'pdfs')
-    CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', '1000'))
-    CHUNK_OVERLAP = int(os.getenv('CHUNK_OVERLAP', '200'))
+    pdf_directory: str = 'pdfs'
+    pdf_cache_directory: str = '.pdf_cache'
+    chat_history_directory: str = '.chat_history'
+    chunk_size: int = 512  # em tokens
+    chunk_overlap: int = 128  # em tokens
     
     # Search Configuration
-    DEFAULT_TOP_K = int(os.getenv('DEFAULT_TOP_K', '5'))
-    SIMILARITY_THRESHOLD = float(os.getenv('SIMILARITY_THRESHOLD', '0.7'))
+    default_top_k: int = 5
+    similarity_threshold: float = 0.7
+    max_context_tokens: int = 3000
+    semantic_cache_threshold: float = 0.95
     
-    @classmethod
-    def validate_config(cls):
+    def validate_config(self):
         """Valida se todas as configurações necessárias estão presentes."""
         required_vars = [
-            ('OPENAI_API_KEY', cls.OPENAI_API_KEY),
-            ('PINE_CONE_API_KEY', cls.PINECONE_API_KEY),
+            ('OPENAI_API_KEY', self.openai_api_key),
+            ('PINE_CONE_API_KEY', self.pinecone_api_key),
         ]
         
         missing_vars = []
@@ -49,3 +63,46 @@ class Config:
         
         return True
 
+
+@lru_cache(maxsize=None)
+def load_config() -> Config:
+    """
+    Lê todas as variáveis de ambiente uma única vez.
+    
+    Returns:
+        Config: Configuração compartilhada por todo o processo.
+    """
+    config = Config(
+        openai_api_key=os.getenv('OPENAI_API_KEY'),
+        embedding_dimensions=int(os.getenv('EMBEDDING_DIMENSIONS', '768')),
+        embedding_cache_path=os.getenv('EMBEDDING_CACHE_PATH', 'embeddings_cache.db'),
+        embedding_batch_size=int(os.getenv('EMBEDDING_BATCH_SIZE', '100')),
+        embedding_max_concurrency=int(os.getenv('EMBEDDING_MAX_CONCURRENCY', '5')),
+        pinecone_api_key=os.getenv('PINE_CONE_API_KEY'),
+        pinecone_environment=os.getenv('PINE_CONE_ENVIRONMENT', 'us-east-1-aws'),
+        pinecone_index_name=os.getenv('PINE_CONE_INDEX_NAME', 'pdf-assistant'),
+        pdf_directory=os.getenv('PDF_DIRECTORY', 'pdfs'),
+        pdf_cache_directory=os.getenv('PDF_CACHE_DIRECTORY', '.pdf_cache'),
+        chat_history_directory=os.getenv('CHAT_HISTORY_DIRECTORY', '.chat_history'),
+        chunk_size=int(os.getenv('CHUNK_SIZE', '512')),
+        chunk_overlap=int(os.getenv('CHUNK_OVERLAP', '128')),
+        default_top_k=int(os.getenv('DEFAULT_TOP_K', '5')),
+        similarity_threshold=float(os.getenv('SIMILARITY_THRESHOLD', '0.7')),
+        max_context_tokens=int(os.getenv('MAX_CONTEXT_TOKENS', '3000')),
+        semantic_cache_threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.95')),
+    )
+    
+    for var_name, value in [
+        ('EMBEDDING_BATCH_SIZE', config.embedding_batch_size),
+        ('EMBEDDING_MAX_CONCURRENCY', config.embedding_max_concurrency),
+        ('CHUNK_SIZE', config.chunk_size),
+    ]:
+        if value <= 0:
+            raise ValueError(f"{var_name} deve ser maior que zero (recebido: {value}).")
+    
+    if config.chunk_overlap >= config.chunk_size:
+        raise ValueError(
+            f"CHUNK_OVERLAP ({config.chunk_overlap}) deve ser menor que CHUNK_SIZE ({config.chunk_size})."
+        )
+    
+    return config
@@ -1,33 +1,68 @@
 """
 Módulo para gerar embeddings usando a API do OpenAI.
 """
-import os
-from typing import List
-from openai import OpenAI
-from dotenv import load_dotenv
-
-if os.getenv("STREAMLIT_CLOUD") != "1":
-    from dotenv import load_dotenv
-    load_dotenv()
+import random
+import time
+import hashlib
+import sqlite3
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+import numpy as np
+from openai import OpenAI, RateLimitError
+from .config import load_config
 
 
 class EmbeddingGenerator:
     """Classe responsável por gerar embeddings usando OpenAI."""
     
-    def __init__(self, api_key: str = None):
+    # Limites da API de embeddings por requisição
+    MAX_INPUTS_PER_REQUEST = 2048
+    MAX_TOKENS_PER_REQUEST = 300_000
+    
+    # Tentativas adicionais do cliente OpenAI em 429 e erros transitórios
+    MAX_RETRIES = 3
+    
+    # Número máximo de hashes por consulta ao cache (limite de parâmetros do SQLite)
+    CACHE_LOOKUP_SIZE = 500
+    
+    def __init__(self, api_key: str = None, model: str = None, dimensions: int = None, cache_path: Optional[str] = None):
         """
         Inicializa o gerador de embeddings.
         
         Args:
             api_key (str): Chave da API OpenAI. Se não fornecida, usa variável de ambiente.
+            model (str): Modelo de embedding. Se não fornecido, usa a configuração.
+            dimensions (int): Dimensão dos vetores. Se não fornecida, usa a configuração.
+            cache_path (str): Arquivo SQLite do cache de embeddings. Se não
+                fornecido, o cache fica desativado.
         """
-        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        config = load_config()
+        self.api_key = api_key or config.openai_api_key
         
         if not self.api_key:
             raise ValueError("API key do OpenAI não encontrada. Configure OPENAI_API_KEY.")
         
-        self.client = OpenAI(api_key=self.api_key)
-        self.model = "text-embedding-ada-002"
+        self.client = OpenAI(api_key=self.api_key, max_retries=self.MAX_RETRIES)
+        self.model = model or config.openai_embedding_model
+        self.dimensions = dimensions or config.embedding_dimensions
+        self.cache_path = cache_path
+        
+        # Número máximo de textos por requisição; cada chunk tem até chunk_size
+        # tokens, então o lote também respeita o limite de tokens da API
+        self.batch_size = max(1, min(
+            config.embedding_batch_size,
+            self.MAX_INPUTS_PER_REQUEST,
+            self.MAX_TOKENS_PER_REQUEST // config.chunk_size
+        ))
+        
+        # Número máximo de requisições simultâneas (respeita limites de rate)
+        self.max_concurrent_requests = config.embedding_max_concurrency
+    
+    @staticmethod
+    def _clean_text(text: str) -> str:
+        """Remove quebras de linha excessivas e espaços."""
+        return text.replace('\n', ' ').strip()
     
     def generate_embedding(self, text: str) -> List[float]:
         """
@@ -40,54 +75,190 @@ class EmbeddingGenerator:
             List[float]: Vetor de embedding.
         """
         try:
-            # Remove quebras de linha excessivas e espaços
-            cleaned_text = text.replace('\n', ' ').strip()
+            cleaned_text = self._clean_text(text)
             
             if not cleaned_text:
                 raise ValueError("Texto vazio fornecido.")
             
-            response = self.client.embeddings.create(
-                input=cleaned_text,
-                model=self.model
-            )
-            
-            return response.data[0].embedding
+            return self._create_embeddings([cleaned_text])[0]
         
         except Exception as e:
             print(f"Erro ao gerar embedding: {str(e)}")
             raise
     
+    def _create_embeddings(self, inputs: List[str]) -> List[List[float]]:
+        """
+        Envia uma requisição de embeddings.
+        
+        Respostas 429 e erros transitórios são repetidos pelo próprio cliente
+        OpenAI (até MAX_RETRIES vezes, respeitando o Retry-After).
+        
+        Args:
+            inputs (List[str]): Textos já limpos.
+            
+        Returns:
+            List[List[float]]: Vetores de embedding na mesma ordem dos textos.
+        """
+        response = self.client.embeddings.create(
+            input=inputs,
+            model=self.model,
+            dimensions=self.dimensions
+        )
+        return [data.embedding for data in response.data]
+    
+    def _embed_batch(self, inputs: List[str], batch_number: int, total_batches: int) -> List[List[float]]:
+        """
+        Gera embeddings para um lote de textos limpos, com fallback item a item.
+        
+        Args:
+            inputs (List[str]): Textos já limpos deste lote.
+            batch_number (int): Número do lote (para log).
+            total_batches (int): Total de lotes (para log).
+            
+        Returns:
+            List[List[float]]: Embeddings do lote (vazio para textos com erro).
+        """
+        # Espalha o início das requisições simultâneas
+        if total_batches > 1:
+            time.sleep(random.uniform(0, 0.1))
+        
+        try:
+            result = self._create_embeddings(inputs)
+            print(f"Embeddings gerados para lote {batch_number}/{total_batches} ({len(inputs)} textos)")
+            return result
+        
+        except RateLimitError as e:
+            # O cliente já esgotou as tentativas; repetir item a item só multiplicaria as esperas
+            print(f"Limite de requisições atingido no lote {batch_number}: {str(e)}")
+            return [[] for _ in inputs]
+        
+        except Exception as e:
+            print(f"Erro ao gerar embeddings para lote {batch_number}: {str(e)}")
+            
+            # Reprocessa individualmente para não perder o lote inteiro
+            result = []
+            for text in inputs:
+                try:
+                    result.append(self._create_embeddings([text])[0])
+                except Exception as e:
+                    print(f"Erro ao gerar embedding no lote {batch_number}: {str(e)}")
+                    result.append([])
+            return result
+    
     def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
         """
         Gera embeddings para uma lista de textos.
         
+        Os textos são limpos uma única vez e textos idênticos são enviados apenas
+        uma vez. As requisições levam até batch_size textos, com até
+        max_concurrent_requests lotes em paralelo. Se um lote falhar, apenas os
+        textos desse lote são reprocessados um a um.
+        
         Args:
             texts (List[str]): Lista de textos para gerar embeddings.
             
         Returns:
             List[List[float]]: Lista de vetores de embedding.
         """
-        embeddings = []
+        cleaned = [self._clean_text(text) for text in texts]
+        
+        for i, text in enumerate(cleaned):
+            if not text:
+                print(f"Erro ao gerar embedding para texto {i+1}: Texto vazio fornecido.")
+        
+        # Textos únicos e não vazios, preservando a ordem
+        unique_texts = list(dict.fromkeys(text for text in cleaned if text))
+        
+        # Reaproveita embeddings já calculados e só envia os textos ausentes
+        embeddings_by_text = self._load_cached_embeddings(unique_texts)
+        missing_texts = [text for text in unique_texts if text not in embeddings_by_text]
+        
+        if embeddings_by_text:
+            print(f"{len(embeddings_by_text)} embedding(s) obtidos do cache.")
         
-        for i, text in enumerate(texts):
-            try:
-                embedding = self.generate_embedding(text)
-                embeddings.append(embedding)
-                print(f"Embedding gerado para texto {i+1}/{len(texts)}")
+        batches = [missing_texts[i:i + self.batch_size] for i in range(0, len(missing_texts), self.batch_size)]
+        
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrent_requests, len(batches))) as executor:
+                results = executor.map(
+                    lambda args: self._embed_batch(args[1], args[0], len(batches)),
+                    enumerate(batches, 1)
+                )
+                
+                new_embeddings = {}
+                for batch, batch_embeddings in zip(batches, results):
+                    new_embeddings.update(zip(batch, batch_embeddings))
             
-            except Exception as e:
-                print(f"Erro ao gerar embedding para texto {i+1}: {str(e)}")
-                # Adiciona um embedding vazio em caso de erro
-                embeddings.append([])
+            self._store_cached_embeddings(new_embeddings)
+            embeddings_by_text.update(new_embeddings)
+        
+        return [embeddings_by_text.get(text, []) if text else [] for text in cleaned]
+    
+    def _cache_key(self, text: str) -> bytes:
+        """Hash do texto limpo, incluindo modelo e dimensão para não misturar vetores."""
+        return hashlib.blake2b(f"{self.model}|{self.dimensions}|{text}".encode('utf-8'), digest_size=16).digest()
+    
+    def _connect_cache(self) -> sqlite3.Connection:
+        """Abre o banco do cache de embeddings, criando a tabela se necessário."""
+        conn = sqlite3.connect(self.cache_path)
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (hash BLOB PRIMARY KEY, vec BLOB)")
+        return conn
+    
+    def _load_cached_embeddings(self, texts: List[str]) -> Dict[str, List[float]]:
+        """
+        Busca no cache os embeddings dos textos informados.
+        
+        Args:
+            texts (List[str]): Textos já limpos.
+            
+        Returns:
+            Dict[str, List[float]]: Embeddings encontrados, indexados pelo texto.
+        """
+        if not self.cache_path or not texts:
+            return {}
+        
+        text_by_key = {self._cache_key(text): text for text in texts}
+        keys = list(text_by_key)
+        found = {}
+        
+        try:
+            with closing(self._connect_cache()) as conn:
+                for i in range(0, len(keys), self.CACHE_LOOKUP_SIZE):
+                    chunk = keys[i:i + self.CACHE_LOOKUP_SIZE]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = conn.execute(f"SELECT hash, vec FROM cache WHERE hash IN ({placeholders})", chunk)
+                    for key, vec in rows:
+                        found[text_by_key[key]] = np.frombuffer(vec, dtype=np.float32).tolist()
+        
+        except sqlite3.Error as e:
+            print(f"Erro ao ler cache de embeddings: {str(e)}")
+        
+        return found
+    
+    def _store_cached_embeddings(self, embeddings_by_text: Dict[str, List[float]]):
+        """Grava no cache os embeddings gerados com sucesso."""
+        rows = [
+            (self._cache_key(text), np.asarray(embedding, dtype=np.float32).tobytes())
+            for text, embedding in embeddings_by_text.items()
+            if embedding
+        ]
+        
+        if not self.cache_path or not rows:
+            return
+        
+        try:
+            with closing(self._connect_cache()) as conn, conn:
+                conn.executemany("INSERT OR REPLACE INTO cache (hash, vec) VALUES (?, ?)", rows)
         
-        return embeddings
+        except sqlite3.Error as e:
+            print(f"Erro ao gravar cache de embeddings: {str(e)}")
     
     def get_embedding_dimension(self) -> int:
         """
         Retorna a dimensão dos embeddings do modelo usado.
         
         Returns:
-            int: Dimensão do embedding (1536 para text-embedding-ada-002).
+            int: Dimensão do embedding (truncada via parâmetro dimensions).
         """
-        return 1536  # Dimensão padrão do text-embedding-ada-002
+        return self.dimensions
 
@@ -0,0 +1,122 @@
+"""
+Módulo de busca vetorial local.
+Para corpora pequenos, ranquear os chunks com uma única multiplicação de
+matriz em memória é mais rápido do que uma consulta de rede ao Pinecone.
+Os vetores são guardados quantizados em int8 (4x menos memória que float32).
+"""
+import threading
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+
+class LocalVectorIndex:
+    """Índice em memória com os embeddings normalizados e quantizados dos chunks."""
+    
+    # Acima deste número de vetores a busca volta a ser feita no Pinecone
+    MAX_VECTORS = 50_000
+    
+    # Linhas convertidas de volta para float32 por vez durante a busca
+    SCORE_BLOCK_SIZE = 4096
+    
+    def __init__(self):
+        """Inicializa o índice vazio."""
+        self._matrix: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._filenames: List[str] = []
+        self._texts: List[str] = []
+        self._chunk_indexes: List[int] = []
+        self._lock = threading.Lock()
+    
+    def build(self, documents: List[Dict[str, Any]], embeddings: List[List[float]], ids: List[str]):
+        """
+        Substitui o conteúdo do índice pelos documentos informados.
+        
+        Args:
+            documents (List[Dict[str, Any]]): Metadados dos chunks.
+            embeddings (List[List[float]]): Embeddings correspondentes; vazios são ignorados.
+            ids (List[str]): IDs dos vetores no Pinecone, na mesma ordem.
+        """
+        rows = [i for i, embedding in enumerate(embeddings) if embedding]
+        
+        if not rows or len(rows) >= self.MAX_VECTORS:
+            self.clear()
+            return
+        
+        matrix = np.ascontiguousarray(np.asarray([embeddings[i] for i in rows], dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        
+        # Quantização int8 com uma escala por vetor: v ≈ q * scale
+        scales = np.abs(matrix).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        quantized = np.round(matrix / scales[:, np.newaxis]).astype(np.int8)
+        
+        with self._lock:
+            self._matrix = quantized
+            self._scales = scales.astype(np.float32)
+            self._ids = [ids[i] for i in rows]
+            self._filenames = [documents[i].get('filename', '') for i in rows]
+            self._texts = [documents[i].get('text', '') for i in rows]
+            self._chunk_indexes = [documents[i].get('chunk_index', i) for i in rows]
+    
+    def query(self, query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Busca os chunks mais similares à pergunta.
+        
+        Args:
+            query_embedding (List[float]): Embedding da pergunta.
+            top_k (int): Número de resultados a retornar.
+        
+        Returns:
+            List[Dict[str, Any]]: Documentos no mesmo formato do PineconeManager.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                return []
+            
+            # Desquantiza em blocos para não materializar a matriz inteira em float32
+            total = self._matrix.shape[0]
+            scores = np.empty(total, dtype=np.float32)
+            for start in range(0, total, self.SCORE_BLOCK_SIZE):
+                end = start + self.SCORE_BLOCK_SIZE
+                scores[start:end] = self._matrix[start:end].astype(np.float32) @ query
+            scores *= self._scales
+            
+            k = min(top_k, total)
+            if k <= 0:
+                return []
+            
+            # argpartition separa os k maiores em O(N); só eles são ordenados
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            
+            return [
+                {
+                    'id': self._ids[i],
+                    'score': float(scores[i]),
+                    'filename': self._filenames[i],
+                    'text': self._texts[i],
+                    'chunk_index': self._chunk_indexes[i]
+                }
+                for i in top
+            ]
+    
+    def clear(self):
+        """Remove todos os vetores do índice."""
+        with self._lock:
+            self._matrix = None
+            self._scales = None
+            self._ids = []
+            self._filenames = []
+            self._texts = []
+            self._chunk_indexes = []
+    
+    def __len__(self) -> int:
+        return len(self._ids)
@@ -2,23 +2,43 @@
 Módulo para extrair texto de arquivos PDF.
 """
 import os
-from typing import List, Dict
-from pypdf import PdfReader
+import json
+import hashlib
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+import tiktoken
+from .config import load_config
+
+# PDFium (C++) é bem mais rápido que o pypdf (Python puro); pypdf fica como fallback
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+    from pypdf import PdfReader
 
 
 class PDFProcessor:
     """Classe responsável por processar arquivos PDF e extrair texto."""
     
-    def __init__(self, pdf_directory: str = "pdfs"):
+    # Tokenizador do modelo de embedding, usado para medir os chunks
+    _encoding = None
+    
+    def __init__(self, pdf_directory: str = "pdfs", cache_directory: Optional[str] = None):
         """
         Inicializa o processador de PDF.
         
         Args:
             pdf_directory (str): Diretório onde estão os arquivos PDF.
+            cache_directory (str): Diretório do cache de texto extraído. Se não
+                fornecido, o cache fica desativado.
         """
         self.pdf_directory = pdf_directory
+        self.cache_directory = cache_directory
     
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
+    @staticmethod
+    def extract_text_from_pdf(pdf_path: str) -> str:
         """
         Extrai texto de um arquivo PDF específico.
         
@@ -29,13 +49,20 @@ class PDFProcessor:
             str: Texto extraído do PDF.
         """
         try:
-            reader = PdfReader(pdf_path)
-            text = ""
-            
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+            if pdfium is not None:
+                pdf = pdfium.PdfDocument(pdf_path)
+                try:
+                    # PDFium separa as linhas com \r\n
+                    parts = [page.get_textpage().get_text_range().replace('\r\n', '\n') for page in pdf]
+                finally:
+                    pdf.close()
+            else:
+                reader = PdfReader(pdf_path)
+                
+                # Acumula em lista para evitar cópias quadráticas de string
+                parts = [page.extract_text() for page in reader.pages]
             
-            return text.strip()
+            return "\n".join(parts).strip()
         
         except Exception as e:
             print(f"Erro ao processar PDF {pdf_path}: {str(e)}")
@@ -54,21 +81,24 @@ class PDFProcessor:
             print(f"Diretório {self.pdf_directory} não encontrado.")
             return documents
         
-        pdf_files = [f for f in os.listdir(self.pdf_directory) if f.lower().endswith('.pdf')]
+        with os.scandir(self.pdf_directory) as entries:
+            pdf_files = [entry.name for entry in entries
+                         if entry.is_file() and entry.name.lower().endswith('.pdf')]
         
         if not pdf_files:
             print(f"Nenhum arquivo PDF encontrado no diretório {self.pdf_directory}.")
             return documents
         
-        for pdf_file in pdf_files:
-            pdf_path = os.path.join(self.pdf_directory, pdf_file)
-            text = self.extract_text_from_pdf(pdf_path)
-            
+        pdf_paths = [os.path.join(self.pdf_directory, f) for f in pdf_files]
+        texts, keys = self._extract_texts(pdf_paths)
+        
+        for pdf_file, pdf_path, text, key in zip(pdf_files, pdf_paths, texts, keys):
             if text:
                 documents.append({
                     'filename': pdf_file,
                     'text': text,
-                    'path': pdf_path
+                    'path': pdf_path,
+                    'content_hash': key
                 })
                 print(f"Processado: {pdf_file}")
             else:
@@ -76,37 +106,205 @@ class PDFProcessor:
         
         return documents
     
-    def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
+    def _extract_texts(self, pdf_paths: List[str]) -> Tuple[List[str], List[Optional[str]]]:
         """
-        Divide o texto em chunks menores para melhor processamento.
+        Extrai o texto de vários PDFs, reaproveitando o cache em disco.
         
         Args:
-            text (str): Texto a ser dividido.
-            chunk_size (int): Tamanho máximo de cada chunk.
-            overlap (int): Sobreposição entre chunks.
+            pdf_paths (List[str]): Caminhos dos arquivos PDF.
             
         Returns:
-            List[str]: Lista de chunks de texto.
+            Tuple[List[str], List[Optional[str]]]: Texto e hash do conteúdo de
+                cada PDF, na mesma ordem dos caminhos.
         """
-        if len(text) <= chunk_size:
-            return [text]
+        cache_index = self._load_cache_index()
+        keys = [self._file_hash(path, cache_index) for path in pdf_paths]
+        texts = [self._read_cached_text(key) for key in keys]
+        
+        missing = [i for i, text in enumerate(texts) if text is None]
+        missing_paths = [pdf_paths[i] for i in missing]
+        
+        if len(pdf_paths) > len(missing):
+            print(f"{len(pdf_paths) - len(missing)} PDF(s) obtidos do cache.")
         
-        chunks = []
-        start = 0
+        # Extração é CPU-bound (pypdf é Python puro), então usa vários processos.
+        # 'spawn' evita o fork de um processo com várias threads (servidor Streamlit).
+        # Cada worker reexecuta o script de entrada como __mp_main__, por isso
+        # streamlit_app.py e frontend/app.py só chamam main() sob o guard de __name__
+        if len(missing_paths) > 1:
+            with ProcessPoolExecutor(
+                max_workers=min(os.cpu_count() or 1, len(missing_paths)),
+                mp_context=multiprocessing.get_context('spawn')
+            ) as executor:
+                extracted = list(executor.map(PDFProcessor.extract_text_from_pdf, missing_paths))
+        else:
+            extracted = [self.extract_text_from_pdf(path) for path in missing_paths]
+        
+        for i, text in zip(missing, extracted):
+            texts[i] = text
+            if text:
+                self._write_cached_text(keys[i], text)
+        
+        self._save_cache_index(cache_index)
+        
+        return texts, keys
+    
+    def _file_hash(self, pdf_path: str, cache_index: Dict[str, Dict]) -> Optional[str]:
+        """
+        Calcula o hash do conteúdo do PDF, evitando reler arquivos inalterados.
         
-        while start < len(text):
-            end = start + chunk_size
+        Args:
+            pdf_path (str): Caminho do arquivo PDF.
+            cache_index (Dict[str, Dict]): Índice caminho -> mtime, tamanho e hash.
             
-            # Se não é o último chunk, tenta encontrar um ponto de quebra natural
-            if end < len(text):
-                # Procura por quebra de linha ou espaço próximo ao final
-                for i in range(end, max(start + chunk_size - 100, start), -1):
-                    if text[i] in ['\n', '.', '!', '?', ' ']:
-                        end = i + 1
-                        break
+        Returns:
+            Optional[str]: Hash BLAKE2b do arquivo, ou None se o cache estiver desativado.
+        """
+        if not self.cache_directory:
+            return None
+        
+        try:
+            stat = os.stat(pdf_path)
+            entry = cache_index.get(pdf_path)
+            
+            # Mesmo mtime e tamanho: assume que o conteúdo não mudou
+            if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                return entry['hash']
+            
+            digest = hashlib.blake2b(digest_size=16)
+            with open(pdf_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+            
+            cache_index[pdf_path] = {
+                'mtime': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'hash': digest.hexdigest()
+            }
+            return digest.hexdigest()
+        
+        except OSError as e:
+            print(f"Erro ao calcular hash de {pdf_path}: {str(e)}")
+            return None
+    
+    def _read_cached_text(self, key: Optional[str]) -> Optional[str]:
+        """Retorna o texto em cache para o hash informado, se existir."""
+        if not key:
+            return None
+        
+        try:
+            with open(os.path.join(self.cache_directory, f"{key}.txt"), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def _write_cached_text(self, key: Optional[str], text: str):
+        """Grava o texto extraído no cache de forma atômica."""
+        if not key:
+            return
+        
+        self._atomic_write(os.path.join(self.cache_directory, f"{key}.txt"), text)
+    
+    def chunk_document(self, document: Dict[str, str], chunk_size: int = 512, overlap: int = 128) -> List[str]:
+        """
+        Divide o texto de um documento em chunks, reaproveitando o cache em disco.
+        
+        O cache é indexado pelo hash do conteúdo do PDF, pelo modelo e pelos
+        parâmetros de chunking, então só é refeito quando algum deles muda.
+        
+        Args:
+            document (Dict[str, str]): Documento retornado por process_all_pdfs.
+            chunk_size (int): Número máximo de tokens de cada chunk.
+            overlap (int): Sobreposição entre chunks, em tokens.
             
-            chunks.append(text[start:end].strip())
-            start = end - overlap if end < len(text) else end
+        Returns:
+            List[str]: Lista de chunks de texto.
+        """
+        key = document.get('content_hash')
+        
+        if not key or not self.cache_directory:
+            return self.chunk_text(document['text'], chunk_size, overlap)
+        
+        cache_path = os.path.join(
+            self.cache_directory,
+            f"{key}.{load_config().openai_embedding_model}.{chunk_size}-{overlap}.json"
+        )
+        
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        
+        chunks = self.chunk_text(document['text'], chunk_size, overlap)
+        self._atomic_write(cache_path, json.dumps(chunks))
         
         return chunks
-
+    
+    def _load_cache_index(self) -> Dict[str, Dict]:
+        """Carrega o índice de mtime/tamanho/hash dos PDFs já vistos."""
+        if not self.cache_directory:
+            return {}
+        
+        try:
+            with open(os.path.join(self.cache_directory, 'index.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_cache_index(self, cache_index: Dict[str, Dict]):
+        """Salva o índice de mtime/tamanho/hash dos PDFs."""
+        if not self.cache_directory:
+            return
+        
+        self._atomic_write(os.path.join(self.cache_directory, 'index.json'), json.dumps(cache_index))
+    
+    def _atomic_write(self, path: str, content: str):
+        """Escreve em um arquivo temporário e o renomeia para o destino final."""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Nome único: sessões do Streamlit são threads do mesmo processo
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with open(fd, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            except OSError:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            print(f"Erro ao gravar cache {path}: {str(e)}")
+    
+    def chunk_text(self, text: str, chunk_size: int = 512, overlap: int = 128) -> List[str]:
+        """
+        Divide o texto em chunks menores para melhor processamento.
+        
+        O tamanho é medido em tokens do modelo de embedding (tiktoken), o que
+        garante que cada chunk respeite o limite do modelo.
+        
+        Args:
+            text (str): Texto a ser dividido.
+            chunk_size (int): Número máximo de tokens de cada chunk.
+            overlap (int): Sobreposição entre chunks, em tokens.
+            
+        Returns:
+            List[str]: Lista de chunks de texto.
+        """
+        if overlap >= chunk_size:
+            raise ValueError("A sobreposição deve ser menor que o tamanho do chunk.")
+        
+        # Carregado sob demanda: o tiktoken baixa o vocabulário no primeiro uso
+        if PDFProcessor._encoding is None:
+            PDFProcessor._encoding = tiktoken.encoding_for_model(load_config().openai_embedding_model)
+        
+        tokens = self._encoding.encode(text)
+        
+        if len(tokens) <= chunk_size:
+            return [text]
+        
+        step = chunk_size - overlap
+        
+        return [
+            self._encoding.decode(tokens[i:i + chunk_size]).strip()
+            for i in range(0, len(tokens) - overlap, step)
+        ]
@@ -1,21 +1,29 @@
 """
 Módulo para gerenciar operações com Pinecone.
 """
-import os
-import uuid
-from typing import List, Dict, Any, Optional
+import time
+import hashlib
+from typing import List, Dict, Any, Optional, Set
 from pinecone import Pinecone, ServerlessSpec
-from dotenv import load_dotenv
-
-if os.getenv("STREAMLIT_CLOUD") != "1":
-    from dotenv import load_dotenv
-    load_dotenv()
+from .config import load_config
 
 
 class PineconeManager:
     """Classe responsável por gerenciar operações com Pinecone."""
     
-    def __init__(self, api_key: str = None, environment: str = None, index_name: str = None):
+    # Número máximo de vetores por upsert (limite do Pinecone)
+    UPSERT_BATCH_SIZE = 100
+    
+    # Número máximo de upserts simultâneos (respeita limites de QPS do índice)
+    MAX_CONCURRENT_UPSERTS = 10
+    
+    # Tempo de vida (segundos) das estatísticas do índice em cache
+    STATS_CACHE_TTL = 30
+    
+    # Número máximo de IDs por requisição de remoção (limite do Pinecone)
+    DELETE_BATCH_SIZE = 1000
+    
+    def __init__(self, api_key: str = None, environment: str = None, index_name: str = None, dimension: int = None):
         """
         Inicializa o gerenciador do Pinecone.
         
@@ -23,10 +31,13 @@ class PineconeManager:
             api_key (str): Chave da API Pinecone.
             environment (str): Ambiente do Pinecone.
             index_name (str): Nome do índice.
+            dimension (int): Dimensão dos vetores do índice.
         """
-        self.api_key = api_key or os.getenv('PINE_CONE_API_KEY')
-        self.environment = environment or os.getenv('PINE_CONE_ENVIRONMENT', 'us-east-1-aws')
-        self.index_name = index_name or os.getenv('PINE_CONE_INDEX_NAME', 'pdf-assistant')
+        config = load_config()
+        self.api_key = api_key or config.pinecone_api_key
+        self.environment = environment or config.pinecone_environment
+        self.index_name = index_name or config.pinecone_index_name
+        self.dimension = dimension or config.embedding_dimensions
         
         if not self.api_key:
             raise ValueError("API key do Pinecone não encontrada. Configure PINE_CONE_API_KEY.")
@@ -35,6 +46,9 @@ class PineconeManager:
         self.pc = Pinecone(api_key=self.api_key)
         self.index = None
         
+        # Cache das estatísticas do índice: (momento da leitura, estatísticas)
+        self._stats_cache = (0.0, None)
+        
         # Conecta ou cria o índice
         self._setup_index()
     
@@ -48,7 +62,7 @@ class PineconeManager:
                 print(f"Criando índice {self.index_name}...")
                 self.pc.create_index(
                     name=self.index_name,
-                    dimension=1536,  # Dimensão do text-embedding-ada-002
+                    dimension=self.dimension,
                     metric='cosine',
                     spec=ServerlessSpec(
                         cloud='aws',
@@ -58,14 +72,85 @@ class PineconeManager:
                 print(f"Índice {self.index_name} criado com sucesso.")
             else:
                 print(f"Índice {self.index_name} já existe.")
+                
+                existing_dimension = self.pc.describe_index(self.index_name).dimension
+                if existing_dimension != self.dimension:
+                    # Upserts e buscas falhariam no Pinecone com dimensões diferentes; os
+                    # vetores existentes vêm de outro modelo e não servem para as buscas
+                    raise ValueError(
+                        f"O índice {self.index_name} tem dimensão {existing_dimension}, mas "
+                        f"EMBEDDING_DIMENSIONS={self.dimension}. Os vetores existentes foram "
+                        f"gerados por outro modelo de embedding: use outro PINE_CONE_INDEX_NAME, "
+                        f"ou esvazie o índice (delete_all_vectors) e reindexe os PDFs com "
+                        f"EMBEDDING_DIMENSIONS={existing_dimension}."
+                    )
             
             # Conecta ao índice
-            self.index = self.pc.Index(self.index_name)
+            self.index = self.pc.Index(self.index_name, pool_threads=self.MAX_CONCURRENT_UPSERTS)
             
         except Exception as e:
             print(f"Erro ao configurar índice: {str(e)}")
             raise
     
+    @staticmethod
+    def file_prefix(filename: str) -> str:
+        """
+        Calcula o prefixo comum aos IDs dos chunks de um arquivo.
+        
+        Args:
+            filename (str): Nome do arquivo PDF.
+            
+        Returns:
+            str: Prefixo dos IDs (hash do nome do arquivo seguido de '#').
+        """
+        return hashlib.blake2b(filename.encode('utf-8'), digest_size=8).hexdigest() + '#'
+    
+    @classmethod
+    def vector_id(cls, doc: Dict[str, Any], position: int) -> str:
+        """
+        Calcula o ID determinístico de um chunk.
+        
+        Reindexar o mesmo chunk sobrescreve o vetor em vez de duplicá-lo, e o
+        prefixo por arquivo permite remover os chunks de um PDF específico.
+        
+        Args:
+            doc (Dict[str, Any]): Metadados do chunk.
+            position (int): Posição do chunk na lista, usada se não houver chunk_index.
+            
+        Returns:
+            str: ID do vetor.
+        """
+        id_source = f"{doc.get('chunk_index', position)}|{doc.get('text', '')}"
+        chunk_hash = hashlib.blake2b(id_source.encode('utf-8'), digest_size=16).hexdigest()
+        return cls.file_prefix(doc.get('filename', '')) + chunk_hash
+    
+    def delete_stale_vectors(self, keep_ids: Set[str], prefix: str = None):
+        """
+        Remove os vetores do índice que não estão em keep_ids.
+        
+        Args:
+            keep_ids (Set[str]): IDs que devem permanecer no índice.
+            prefix (str): Restringe a remoção aos IDs com este prefixo.
+        """
+        try:
+            stale_ids = [
+                vector_id
+                for page in self.index.list(prefix=prefix)
+                for vector_id in page
+                if vector_id not in keep_ids
+            ]
+            
+            for i in range(0, len(stale_ids), self.DELETE_BATCH_SIZE):
+                self.index.delete(ids=stale_ids[i:i + self.DELETE_BATCH_SIZE])
+            
+            if stale_ids:
+                print(f"Removidos {len(stale_ids)} vetores desatualizados.")
+                self._stats_cache = (0.0, None)
+        
+        except Exception as e:
+            print(f"Erro ao remover vetores desatualizados: {str(e)}")
+            raise
+    
     def upsert_documents(self, documents: List[Dict[str, Any]], embeddings: List[List[float]]):
         """
         Insere ou atualiza documentos no índice.
@@ -83,13 +168,12 @@ class PineconeManager:
             if not embedding:  # Pula embeddings vazios
                 continue
             
-            vector_id = str(uuid.uuid4())
+            vector_id = self.vector_id(doc, i)
             
             metadata = {
                 'filename': doc.get('filename', ''),
-                'text': doc.get('text', '')[:1000],  # Limita texto nos metadados
-                'chunk_index': i,
-                'full_text': doc.get('text', '')  # Texto completo
+                'chunk_index': doc.get('chunk_index', i),
+                'full_text': doc.get('text', '')  # Único campo de texto lido nas buscas
             }
             
             vectors.append({
@@ -100,14 +184,26 @@ class PineconeManager:
         
         if vectors:
             try:
-                # Insere em lotes de 100 (limite do Pinecone)
-                batch_size = 100
-                for i in range(0, len(vectors), batch_size):
-                    batch = vectors[i:i + batch_size]
-                    self.index.upsert(vectors=batch)
-                    print(f"Inseridos {len(batch)} vetores (lote {i//batch_size + 1})")
+                batch_size = self.UPSERT_BATCH_SIZE
+                batches = [vectors[i:i + batch_size] for i in range(0, len(vectors), batch_size)]
+                
+                # Envia até MAX_CONCURRENT_UPSERTS lotes em paralelo e aguarda cada grupo
+                for start in range(0, len(batches), self.MAX_CONCURRENT_UPSERTS):
+                    group = batches[start:start + self.MAX_CONCURRENT_UPSERTS]
+                    async_results = [self.index.upsert(vectors=batch, async_req=True) for batch in group]
+                    
+                    for batch_number, (batch, async_result) in enumerate(zip(group, async_results), start + 1):
+                        async_result.get()
+                        print(f"Inseridos {len(batch)} vetores (lote {batch_number})")
                 
                 print(f"Total de {len(vectors)} vetores inseridos com sucesso.")
+                self._stats_cache = (0.0, None)
+                
+                # Chunks antigos dos arquivos reindexados (PDF alterado) deixariam
+                # de ser sobrescritos; remove-os depois que os novos já estão no índice
+                keep_ids = {vector['id'] for vector in vectors}
+                for prefix in {self.file_prefix(doc.get('filename', '')) for doc in documents}:
+                    self.delete_stale_vectors(keep_ids, prefix)
             
             except Exception as e:
                 print(f"Erro ao inserir vetores: {str(e)}")
@@ -148,20 +244,29 @@ class PineconeManager:
             print(f"Erro ao buscar documentos similares: {str(e)}")
             raise
     
-    def get_index_stats(self) -> Dict[str, Any]:
+    def get_index_stats(self, force_refresh: bool = False) -> Dict[str, Any]:
         """
-        Retorna estatísticas do índice.
+        Retorna estatísticas do índice (em cache por STATS_CACHE_TTL segundos).
+        
+        Args:
+            force_refresh (bool): Ignora o cache e consulta o Pinecone.
         
         Returns:
             Dict[str, Any]: Estatísticas do índice.
         """
+        cached_at, cached_stats = self._stats_cache
+        if not force_refresh and cached_stats is not None and time.monotonic() - cached_at < self.STATS_CACHE_TTL:
+            return cached_stats
+        
         try:
             stats = self.index.describe_index_stats()
-            return {
+            result = {
                 'total_vectors': stats.total_vector_count,
                 'dimension': stats.dimension,
                 'index_fullness': stats.index_fullness
             }
+            self._stats_cache = (time.monotonic(), result)
+            return result
         except Exception as e:
             print(f"Erro ao obter estatísticas: {str(e)}")
             return {}
@@ -170,6 +275,7 @@ class PineconeManager:
         """Remove todos os vetores do índice."""
         try:
             self.index.delete(delete_all=True)
+            self._stats_cache = (0.0, None)
             print("Todos os vetores foram removidos do índice.")
         except Exception as e:
             print(f"Erro ao remover vetores: {str(e)}")
@@ -0,0 +1,91 @@
+"""
+Módulo de cache semântico de respostas.
+Reaproveita respostas de perguntas anteriores cujo embedding é muito similar
+ao da pergunta atual, evitando a busca no Pinecone e a chamada ao GPT.
+"""
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+
+
+class SemanticCache:
+    """Cache em memória de respostas indexado por similaridade de embedding."""
+    
+    def __init__(self, threshold: float = 0.95, max_entries: int = 2000):
+        """
+        Inicializa o cache semântico.
+        
+        Args:
+            threshold (float): Similaridade de cosseno mínima para considerar um acerto.
+            max_entries (int): Número máximo de respostas guardadas.
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._embeddings: Optional[np.ndarray] = None
+        self._entries: List[Tuple[str, List[Dict[str, Any]]]] = []
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """Converte o embedding em vetor float32 de norma unitária."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def get(self, embedding: List[float]) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Busca uma resposta para uma pergunta semanticamente equivalente.
+        
+        Args:
+            embedding (List[float]): Embedding da pergunta.
+        
+        Returns:
+            Optional[Tuple[str, List[Dict[str, Any]]]]: Resposta e fontes, ou None.
+        """
+        query = self._normalize(embedding)
+        
+        with self._lock:
+            if self._embeddings is None or self._embeddings.shape[1] != query.shape[0]:
+                return None
+            
+            similarities = self._embeddings @ query
+            best = int(np.argmax(similarities))
+            
+            if similarities[best] >= self.threshold:
+                return self._entries[best]
+        
+        return None
+    
+    def put(self, embedding: List[float], answer: str, sources: List[Dict[str, Any]]):
+        """
+        Guarda a resposta de uma pergunta.
+        
+        Args:
+            embedding (List[float]): Embedding da pergunta.
+            answer (str): Resposta gerada.
+            sources (List[Dict[str, Any]]): Fontes consultadas.
+        """
+        vector = self._normalize(embedding)[np.newaxis, :]
+        
+        with self._lock:
+            if self._embeddings is None or self._embeddings.shape[1] != vector.shape[1]:
+                self._embeddings = vector
+                self._entries = [(answer, sources)]
+                return
+            
+            # Descarta as entradas mais antigas ao atingir o limite
+            if len(self._entries) >= self.max_entries:
+                self._embeddings = self._embeddings[1:]
+                self._entries = self._entries[1:]
+            
+            self._embeddings = np.vstack([self._embeddings, vector])
+            self._entries.append((answer, sources))
+    
+    def clear(self):
+        """Remove todas as respostas do cache."""
+        with self._lock:
+            self._embeddings = None
+            self._entries = []
+    
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1 @@
+# Frontend modules
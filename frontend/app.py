@@ -3,31 +3,96 @@ Interface Streamlit para o Assistente Conversacional baseado em LLM.
 """
 import streamlit as st
 import os
-import sys
-from typing import Dict, Any
-
-# Adiciona o diretório backend ao path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+import shutil
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Deque, Iterable, Iterator, List
 
 from backend.assistant import ConversationalAssistant
-from backend.config import Config
+from backend.config import load_config
+from backend.semantic_cache import SemanticCache
+from frontend.chat_history import (
+    MAX_CHAT_HISTORY, ChatTurn, Source, is_valid_session_id,
+    load_chat_history, save_chat_history, sources_from_result
+)
+
+# Tamanho do bloco usado ao gravar os PDFs enviados
+COPY_BUFFER_SIZE = 1 << 20
+
+
+@st.cache_resource(show_spinner=False)
+def get_assistant() -> ConversationalAssistant:
+    """Retorna o assistente compartilhado por todas as sessões do processo."""
+    return ConversationalAssistant()
+
+
+@st.cache_resource(show_spinner=False)
+def get_semantic_cache() -> SemanticCache:
+    """Retorna o cache semântico de respostas compartilhado entre sessões."""
+    return SemanticCache(threshold=load_config().semantic_cache_threshold)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_status(_assistant: ConversationalAssistant) -> Dict[str, Any]:
+    """
+    Status do sistema, reaproveitado entre reruns por até 30 segundos.
+    
+    Esta é a única camada de TTL: ao recalcular (expiração ou clear()), as
+    estatísticas são buscadas no Pinecone sem passar pelo cache do backend.
+    """
+    return _assistant.get_system_status(force_refresh=True)
+
+
+@st.cache_data(ttl=10, show_spinner=False)
+def list_pdfs(pdf_dir: str) -> List[str]:
+    """Lista os PDFs do diretório, reaproveitando o resultado por até 10 segundos."""
+    if not os.path.isdir(pdf_dir):
+        return []
+    
+    # scandir traz o tipo da entrada junto com o nome, sem um stat() por arquivo
+    with os.scandir(pdf_dir) as entries:
+        return [entry.name for entry in entries
+                if entry.is_file() and entry.name.lower().endswith('.pdf')]
+
+
+def persist_chat_history():
+    """Grava o histórico da sessão atual no disco."""
+    save_chat_history(
+        load_config().chat_history_directory,
+        st.session_state.session_id,
+        st.session_state.chat_history
+    )
+
+
+def new_chat_history(turns: Iterable[ChatTurn] = ()) -> Deque[ChatTurn]:
+    """Cria o histórico da sessão, descartando as perguntas mais antigas além do limite."""
+    return deque(turns, maxlen=MAX_CHAT_HISTORY)
 
 
 def init_session_state():
     """Inicializa o estado da sessão."""
-    if 'assistant' not in st.session_state:
-        st.session_state.assistant = None
+    if 'session_id' not in st.session_state:
+        # O id fica na URL para que a mesma conversa seja recuperada após
+        # recarregar a página ou reiniciar o servidor
+        session_id = st.query_params.get('sid')
+        if not is_valid_session_id(session_id):
+            session_id = uuid.uuid4().hex
+        st.query_params['sid'] = session_id
+        st.session_state.session_id = session_id
     if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
-    if 'system_status' not in st.session_state:
-        st.session_state.system_status = None
+        st.session_state.chat_history = new_chat_history(
+            load_chat_history(load_config().chat_history_directory, st.session_state.session_id)
+        )
+    st.session_state.setdefault('system_status', None)
 
 
 def check_environment_variables():
     """Verifica se as variáveis de ambiente estão configuradas."""
+    config = load_config()
     required_vars = {
-        'OPENAI_API_KEY': os.getenv('OPENAI_API_KEY'),
-        'PINE_CONE_API_KEY': os.getenv('PINE_CONE_API_KEY'),
+        'OPENAI_API_KEY': config.openai_api_key,
+        'PINE_CONE_API_KEY': config.pinecone_api_key,
     }
     
     missing_vars = [var for var, value in required_vars.items() if not value]
@@ -43,10 +108,9 @@ def check_environment_variables():
 def initialize_assistant():
     """Inicializa o assistente conversacional."""
     try:
-        if st.session_state.assistant is None:
-            with st.spinner("Inicializando assistente..."):
-                st.session_state.assistant = ConversationalAssistant()
-                st.session_state.system_status = st.session_state.assistant.get_system_status()
+        with st.spinner("Inicializando assistente..."):
+            assistant = get_assistant()
+            st.session_state.system_status = _cached_status(assistant)
         return True
     except Exception as e:
         st.error(f"Erro ao inicializar assistente: {str(e)}")
@@ -77,6 +141,20 @@ def display_system_status():
                 st.metric("Ocupação do Índice", f"{status['index_fullness']:.1%}")
 
 
+def save_uploaded_file(uploaded_file, pdf_dir: str) -> str:
+    """
+    Salva um arquivo enviado em blocos de 1 MiB, sem copiar o conteúdo inteiro na memória.
+    
+    Returns:
+        str: Nome do arquivo salvo.
+    """
+    file_path = os.path.join(pdf_dir, uploaded_file.name)
+    uploaded_file.seek(0)
+    with open(file_path, "wb", buffering=COPY_BUFFER_SIZE) as f:
+        shutil.copyfileobj(uploaded_file, f, COPY_BUFFER_SIZE)
+    return uploaded_file.name
+
+
 def handle_pdf_upload():
     """Gerencia o upload e processamento de PDFs."""
     st.subheader("📄 Gerenciamento de Documentos")
@@ -91,22 +169,26 @@ def handle_pdf_upload():
     
     if uploaded_files:
         # Salva arquivos na pasta pdfs
-        pdf_dir = Config.PDF_DIRECTORY
+        pdf_dir = load_config().pdf_directory
         os.makedirs(pdf_dir, exist_ok=True)
         
-        saved_files = []
-        for uploaded_file in uploaded_files:
-            file_path = os.path.join(pdf_dir, uploaded_file.name)
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            saved_files.append(uploaded_file.name)
+        # Gravação em disco é IO-bound: salva os arquivos em paralelo
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            saved_files = list(executor.map(
+                lambda uploaded_file: save_uploaded_file(uploaded_file, pdf_dir),
+                uploaded_files
+            ))
         
         st.success(f"✅ {len(saved_files)} arquivo(s) salvos: {', '.join(saved_files)}")
         
+        # Novos arquivos só aparecem na listagem após invalidar o cache
+        if not set(saved_files).issubset(list_pdfs(pdf_dir)):
+            list_pdfs.clear()
+        
         # Botão para indexar documentos
         if st.button("🔄 Indexar Documentos", type="primary"):
             with st.spinner("Processando e indexando documentos..."):
-                result = st.session_state.assistant.index_pdfs()
+                result = get_assistant().index_pdfs()
                 
                 if result['success']:
                     st.success(f"✅ {result['message']}")
@@ -114,16 +196,19 @@ def handle_pdf_upload():
                     st.info(f"📊 Chunks criados: {result['chunks_created']}")
                     st.info(f"📊 Embeddings gerados: {result['embeddings_generated']}")
                     
+                    # Respostas em cache podem estar desatualizadas após nova indexação
+                    get_semantic_cache().clear()
+                    
                     # Atualiza status do sistema
-                    st.session_state.system_status = st.session_state.assistant.get_system_status()
+                    _cached_status.clear()
                     st.rerun()
                 else:
                     st.error(f"❌ {result['message']}")
     
     # Lista arquivos existentes
-    pdf_dir = Config.PDF_DIRECTORY
+    pdf_dir = load_config().pdf_directory
     if os.path.exists(pdf_dir):
-        pdf_files = [f for f in os.listdir(pdf_dir) if f.lower().endswith('.pdf')]
+        pdf_files = list_pdfs(pdf_dir)
         if pdf_files:
             st.write("📁 **Arquivos PDF existentes:**")
             for file in pdf_files:
@@ -132,8 +217,81 @@ def handle_pdf_upload():
             st.info("Nenhum arquivo PDF encontrado no diretório.")
 
 
+def ask_with_semantic_cache(question: str) -> Dict[str, Any]:
+    """
+    Responde a pergunta em streaming, reaproveitando respostas de perguntas equivalentes.
+    
+    O resultado segue o formato de ConversationalAssistant.ask_question_stream.
+    """
+    assistant = get_assistant()
+    cache = get_semantic_cache()
+    
+    try:
+        question_embedding = assistant.embed_question(question)
+    except Exception as e:
+        # O cliente OpenAI já repetiu a chamada; o fluxo normal geraria o mesmo embedding de novo
+        return {
+            'success': False,
+            'message': f'Erro ao processar pergunta: {str(e)}',
+            'answer': '',
+            'sources': [],
+            'answer_stream': iter([''])
+        }
+    
+    cached = cache.get(question_embedding)
+    if cached:
+        answer, sources = cached
+        return {
+            'success': True,
+            'message': 'Resposta obtida do cache semântico.',
+            'answer': answer,
+            'sources': sources,
+            'answer_stream': iter([answer])
+        }
+    
+    result = assistant.ask_question_stream(question)
+    
+    # Só guarda respostas baseadas em documentos encontrados
+    if result['success'] and result['sources']:
+        result['answer_stream'] = _cache_after_stream(result['answer_stream'], result, cache, question_embedding)
+    
+    return result
+
+
+def _cache_after_stream(answer_stream: Iterator[str], result: Dict[str, Any], cache: SemanticCache, question_embedding: List[float]) -> Iterator[str]:
+    """Repassa o streaming da resposta e a guarda no cache semântico ao final."""
+    yield from answer_stream
+    
+    # Mensagens de erro não podem ser servidas para outras perguntas/sessões
+    if not result.get('error'):
+        cache.put(question_embedding, result['answer'], result['sources'])
+
+
+def display_sources(sources: Iterable[Source]):
+    """Exibe as fontes consultadas para uma resposta."""
+    if sources:
+        with st.expander("📚 Fontes consultadas"):
+            for source in sources:
+                st.write(f"• {source.filename} (similaridade: {source.score:.3f})")
+
+
+def display_chat_turn(turn: ChatTurn):
+    """Exibe uma pergunta e sua resposta como mensagens de chat."""
+    with st.chat_message("user"):
+        st.markdown(turn.question)
+    with st.chat_message("assistant"):
+        st.markdown(turn.answer)
+        display_sources(turn.sources)
+
+
+@st.fragment
 def handle_chat_interface():
-    """Gerencia a interface de chat."""
+    """
+    Gerencia a interface de chat.
+    
+    Roda como fragmento: enviar uma pergunta reexecuta apenas o chat, sem
+    refazer a barra lateral, o status do sistema e a listagem de documentos.
+    """
     st.subheader("💬 Chat com o Assistente")
     
     # Verifica se há vetores indexados
@@ -141,47 +299,43 @@ def handle_chat_interface():
         st.warning("⚠️ Nenhum documento foi indexado ainda. Faça upload e indexe documentos primeiro.")
         return
     
-    # Exibe histórico do chat
-    for i, (question, answer, sources) in enumerate(st.session_state.chat_history):
-        with st.container():
-            st.write(f"**👤 Você:** {question}")
-            st.write(f"**🤖 Assistente:** {answer}")
-            
-            if sources:
-                with st.expander("📚 Fontes consultadas"):
-                    for source in sources:
-                        st.write(f"• {source['filename']} (similaridade: {source['score']:.3f})")
-            
-            st.divider()
-    
-    # Botão para limpar chat (fora do formulário)
+    # Botão para limpar chat; o clique já reexecuta o fragmento
     if st.button("🗑️ Limpar Chat"):
-        st.session_state.chat_history = []
-        st.rerun()
-    
-    # Container para o formulário de pergunta
-    with st.form(key="question_form", clear_on_submit=True):
-        question = st.text_input(
-            "Faça sua pergunta:",
-            placeholder="Digite sua pergunta sobre os documentos..."
-        )
-        
-        ask_button = st.form_submit_button("🚀 Perguntar", type="primary", use_container_width=True)
+        st.session_state.chat_history = new_chat_history()
+        persist_chat_history()
+    
+    # As mensagens ficam acima do campo de pergunta
+    messages = st.container()
+    question = st.chat_input("Digite sua pergunta sobre os documentos...", key="chat_in")
+    
+    history = st.session_state.chat_history
     
-    if ask_button and question:
-        with st.spinner("Processando pergunta..."):
-            result = st.session_state.assistant.ask_question(question)
+    with messages:
+        # Exibe histórico do chat (mais antigas primeiro)
+        for turn in history:
+            display_chat_turn(turn)
+        
+        if not question:
+            return
+        
+        with st.chat_message("user"):
+            st.markdown(question)
+        
+        with st.chat_message("assistant"):
+            with st.spinner("Processando pergunta..."):
+                result = ask_with_semantic_cache(question)
             
-            if result['success']:
-                # Adiciona ao histórico
-                st.session_state.chat_history.append((
-                    question,
-                    result['answer'],
-                    result['sources']
-                ))
-                st.rerun()
-            else:
+            if not result['success']:
                 st.error(f"❌ {result['message']}")
+                return
+            
+            # Exibe a resposta à medida que é gerada
+            answer = st.write_stream(result['answer_stream'])
+            sources = sources_from_result(result['sources'])
+            display_sources(sources)
+        
+        history.append(ChatTurn(question, answer, sources))
+        persist_chat_history()
 
 
 def main():
@@ -215,7 +369,7 @@ def main():
         st.markdown("---")
         
         if st.button("🔄 Atualizar Status"):
-            st.session_state.system_status = st.session_state.assistant.get_system_status()
+            _cached_status.clear()
             st.rerun()
     
     # Tabs principais
@@ -0,0 +1,125 @@
+"""
+Estruturas do histórico de chat guardado na sessão e sua persistência em disco.
+"""
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Número máximo de perguntas mantidas no histórico de cada sessão
+MAX_CHAT_HISTORY = 200
+
+# Limites do histórico persistido: número de sessões e tempo (segundos) sem uso
+MAX_STORED_SESSIONS = 1000
+STORED_SESSION_TTL = 30 * 24 * 3600
+
+# IDs de sessão são uuid4 em hexadecimal; qualquer outro valor da URL é ignorado
+_SESSION_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+@dataclass
+class Source:
+    """Fonte consultada para uma resposta."""
+    # __slots__ explícito (em vez de slots=True) para manter compatibilidade com Python 3.8
+    __slots__ = ('filename', 'score')
+    
+    filename: str
+    score: float
+
+
+@dataclass
+class ChatTurn:
+    """Pergunta do usuário e a resposta do assistente."""
+    __slots__ = ('question', 'answer', 'sources')
+    
+    question: str
+    answer: str
+    sources: Tuple[Source, ...]
+
+
+def sources_from_result(sources: List[Dict[str, Any]]) -> Tuple[Source, ...]:
+    """Converte as fontes retornadas pelo assistente para o formato do histórico."""
+    return tuple(Source(source['filename'], source['score']) for source in sources)
+
+
+def is_valid_session_id(session_id: Any) -> bool:
+    """Indica se o valor pode ser usado como ID de sessão (e nome de arquivo)."""
+    return isinstance(session_id, str) and bool(_SESSION_ID_PATTERN.fullmatch(session_id))
+
+
+def load_chat_history(directory: str, session_id: str) -> List[ChatTurn]:
+    """
+    Lê o histórico persistido de uma sessão.
+    
+    Args:
+        directory (str): Diretório do histórico persistido.
+        session_id (str): ID da sessão.
+    
+    Returns:
+        List[ChatTurn]: Perguntas e respostas, ou lista vazia se não houver histórico.
+    """
+    try:
+        with open(os.path.join(directory, f"{session_id}.json"), 'r', encoding='utf-8') as f:
+            turns = json.load(f)
+        return [
+            ChatTurn(turn['question'], turn['answer'], tuple(Source(**source) for source in turn['sources']))
+            for turn in turns
+        ]
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+
+
+def save_chat_history(directory: str, session_id: str, turns: Iterable[ChatTurn]):
+    """
+    Grava o histórico de uma sessão de forma atômica.
+    
+    Ao criar o arquivo de uma nova sessão, remove as sessões expiradas e as
+    mais antigas além de MAX_STORED_SESSIONS.
+    
+    Args:
+        directory (str): Diretório do histórico persistido.
+        session_id (str): ID da sessão.
+        turns (Iterable[ChatTurn]): Perguntas e respostas da sessão.
+    """
+    path = os.path.join(directory, f"{session_id}.json")
+    
+    try:
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(path):
+            _prune_stored_sessions(directory)
+        
+        # Nome único: sessões do Streamlit são threads do mesmo processo
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump([asdict(turn) for turn in turns], f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+    except OSError as e:
+        print(f"Erro ao gravar histórico {path}: {str(e)}")
+
+
+def _prune_stored_sessions(directory: str):
+    """Mantém no máximo MAX_STORED_SESSIONS - 1 sessões recentes no diretório."""
+    now = time.time()
+    sessions = []
+    
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # Só arquivos de sessão: o diretório pode conter outros arquivos .json
+            name, extension = os.path.splitext(entry.name)
+            if extension == '.json' and is_valid_session_id(name) and entry.is_file():
+                sessions.append((entry.stat().st_mtime, entry.path))
+    
+    sessions.sort(reverse=True)
+    for position, (modified_at, path) in enumerate(sessions):
+        if position >= MAX_STORED_SESSIONS - 1 or now - modified_at > STORED_SESSION_TTL:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -2,8 +2,8 @@
 Script para executar o assistente conversacional.
 """
 import os
-import sys
 import subprocess
+import sys
 
 # Adiciona o diretório raiz ao path
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -26,11 +26,25 @@ def main():
     print("🌐 Acesse: http://localhost:8501")
     print("---")
     
+    # No Windows o exec não substitui o processo (inicia outro e encerra este),
+    # então o Streamlit roda como processo filho
+    if os.name == 'nt':
+        try:
+            subprocess.run(cmd, cwd=project_root)
+        except KeyboardInterrupt:
+            print("\n👋 Assistente encerrado pelo usuário.")
+        except OSError as e:
+            print(f"❌ Erro ao executar aplicação: {str(e)}")
+        return
+    
+    # Substitui este processo pelo Streamlit, que passa a tratar os sinais
+    # (Ctrl+C) diretamente; a saída pendente é gravada antes do exec
+    sys.stdout.flush()
+    
     try:
-        subprocess.run(cmd, cwd=project_root)
-    except KeyboardInterrupt:
-        print("\n👋 Assistente encerrado pelo usuário.")
-    except Exception as e:
+        os.chdir(project_root)
+        os.execvp(sys.executable, cmd)
+    except OSError as e:
         print(f"❌ Erro ao executar aplicação: {str(e)}")
 
 if __name__ == "__main__":
@@ -1,10 +1,10 @@
 # streamlit_app.py
 
-import sys
-import os
+# Importa a interface como módulo: o Python reaproveita o bytecode em cache
+# e o Streamlit acompanha alterações no arquivo normalmente.
+from frontend import app
 
-# Garante que o backend seja encontrado nos imports
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "backend")))
-
-# Executa diretamente a interface Streamlit do app
-exec(open("frontend/app.py").read())
+# Os processos de extração de PDF (spawn) reexecutam este script como
+# __mp_main__; o guard evita que cada um deles monte a interface inteira
+if __name__ == "__main__":
+    app.main()